@@ -44,6 +44,9 @@ DOMAIN = os.environ.get('DOMAIN', 'http://localhost:8000')
 
 # API Gatewayを直接呼び出す用
 FORCE_SCRIPT_NAME = os.environ.get('SCRIPT_NAME', '')
+# trueの場合、LambdaでAPI Gatewayのステージ名をASGIのroot_pathとしてURLの先頭に付ける
+# （FORCE_SCRIPT_NAMEが空の場合のみ有効．CloudFront経由では付けないためデフォルトはfalse）
+STAGE_ROOT_PATH = os.environ.get('STAGE_ROOT_PATH', 'false').lower() == 'true'
 
 # Logger is configured in LOGGING below
 
@@ -0,0 +1,23 @@
+"""
+Pre-keyed HMAC-SHA256 state for Cognito SECRET_HASH
+Used by accounts.views to skip HMAC key scheduling on every call
+"""
+import functools
+import hmac
+
+
+@functools.lru_cache(maxsize=8)
+def hmac_prototype(client_secret):
+  """
+  Keyed HMAC-SHA256 object for a client secret
+
+  Key scheduling (inner/outer pad derivation) runs once per secret;
+  callers must .copy() the returned object before update()
+
+  Args:
+    client_secret: App client secret (UTF-8 encoded bytes)
+
+  Returns:
+    hmac.HMAC: Keyed object to copy per message
+  """
+  return hmac.new(client_secret, None, 'sha256')
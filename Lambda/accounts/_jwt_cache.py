@@ -0,0 +1,64 @@
+"""
+Bounded TTL cache for verified Cognito JWT claims
+Used by CognitoAuthMiddleware to skip RS256 verification for repeated tokens
+
+Keys are SHA-256 digests of the token string (the raw token is never stored)
+"""
+import hashlib
+import threading
+import time
+from cachetools import TTLCache
+from django.conf import settings
+
+_lock = threading.RLock()
+_claims_cache = TTLCache(
+  maxsize=getattr(settings, 'COGNITO_JWT_CACHE_SIZE', 10000),
+  ttl=getattr(settings, 'COGNITO_JWT_CACHE_TTL', 5)
+)
+
+
+def token_key(token):
+  """
+  Build cache key for a token
+
+  Args:
+    token: JWT token string
+
+  Returns:
+    bytes: SHA-256 digest of the token
+  """
+  return hashlib.sha256(token.encode('utf-8')).digest()
+
+
+def get_claims(key):
+  """
+  Get cached claims for a token key
+
+  Entries are kept for min(token exp, cached time + TTL)
+
+  Args:
+    key: Cache key from token_key()
+
+  Returns:
+    dict: Cached claims if present and not expired, None otherwise
+  """
+  with _lock:
+    claims = _claims_cache.get(key)
+    if claims is None:
+      return None
+    if claims.get('exp', 0) <= time.time():
+      _claims_cache.pop(key, None)
+      return None
+    return claims
+
+
+def set_claims(key, claims):
+  """Store verified claims for a token key"""
+  with _lock:
+    _claims_cache[key] = claims
+
+
+def evict(key):
+  """Remove cached claims for a token key"""
+  with _lock:
+    _claims_cache.pop(key, None)
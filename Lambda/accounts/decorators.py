@@ -3,9 +3,109 @@ Custom decorators for Cognito authentication
 Replacement for Django's @login_required in DSQL mode
 """
 from functools import wraps
-from django.http import JsonResponse, HttpResponse
+import json
+from django.http import HttpResponse
 from django.shortcuts import render
 
+# Static 401 bodies, built once at import time
+# JSON is serialized once (JsonResponse would re-run json.dumps per call)
+_AUTH_REQUIRED_JSON = json.dumps({
+  'error': 'Authentication required',
+  'detail': 'Please provide a valid Cognito JWT token in Authorization header or id_token cookie'
+}).encode('utf-8')
+
+_AUTH_REQUIRED_HTML = '''
+<!DOCTYPE html>
+<html>
+<head>
+  <title>Authentication Required</title>
+  <style>
+    body { font-family: Arial, sans-serif; max-width: 600px; margin: 50px auto; padding: 20px; }
+    .error-box { background-color: #f8d7da; border: 1px solid #f5c6cb; padding: 20px; border-radius: 5px; }
+    h1 { color: #721c24; }
+    a { color: #007bff; text-decoration: none; }
+  </style>
+</head>
+<body>
+  <div class="error-box">
+    <h1>🔒 Authentication Required</h1>
+    <p>This page requires AWS Cognito authentication.</p>
+    <p>Please provide a valid JWT token via:</p>
+    <ul>
+      <li>Authorization header: <code>Bearer &lt;token&gt;</code></li>
+      <li>Cookie: <code>id_token=&lt;token&gt;</code></li>
+    </ul>
+    <p><a href="/">← Back to Home</a></p>
+  </div>
+</body>
+</html>
+'''.encode('utf-8')
+
+# Requests treated as API requests (JSON 401 response)
+_API_PREFIXES = ('/api/',)
+_JSON_MIME = 'application/json'
+
+
+def _json_401_response():
+  """Build 401 JSON response from the pre-serialized body"""
+  return HttpResponse(_AUTH_REQUIRED_JSON, status=401, content_type='application/json')
+
+
+def _unauth_response(request):
+  """Build 401 response: JSON for API requests, HTML page for browsers"""
+  # Check if this is an API request (Accept: application/json)
+  if request.path_info.startswith(_API_PREFIXES) or _JSON_MIME in request.META.get('HTTP_ACCEPT', ''):
+    return _json_401_response()
+
+  # Return HTML error page for browser requests
+  return HttpResponse(_AUTH_REQUIRED_HTML, status=401, content_type='text/html; charset=utf-8')
+
+
+def _require(check_attr=None, denied_detail=None):
+  """
+  Build an authentication decorator
+
+  Everything is resolved at decoration time so the wrapper only does
+  the checks it needs
+
+  Args:
+    check_attr: User attribute that must be true (e.g. 'is_staff'), None for login only
+    denied_detail: 403 detail message when check_attr is false
+
+  Returns:
+    function: Decorator for views
+  """
+  if check_attr is None:
+    def decorator(view_func):
+      @wraps(view_func)
+      def wrapper(request, *args, **kwargs):
+        if request.user.is_anonymous:
+          return _unauth_response(request)
+        return view_func(request, *args, **kwargs)
+      return wrapper
+    return decorator
+
+  forbidden_body = json.dumps({
+    'error': 'Permission denied',
+    'detail': denied_detail
+  }).encode('utf-8')
+
+  def decorator(view_func):
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+      if request.user.is_anonymous:
+        return _json_401_response()
+      if not getattr(request.user, check_attr):
+        return HttpResponse(forbidden_body, status=403, content_type='application/json')
+      return view_func(request, *args, **kwargs)
+    return wrapper
+  return decorator
+
+
+_login_required = _require()
+_superuser_required = _require('is_superuser', 'Superuser access required')
+_staff_required = _require('is_staff', 'Staff access required')
+
 
 def cognito_login_required(view_func):
   """
@@ -17,49 +117,7 @@ def cognito_login_required(view_func):
       # request.user is guaranteed to exist here
       return JsonResponse({'user': request.user.email})
   """
-  @wraps(view_func)
-  def wrapper(request, *args, **kwargs):
-    if not request.user:
-      # Check if this is an API request (Accept: application/json)
-      accept_header = request.headers.get('Accept', '')
-      if 'application/json' in accept_header or request.path.startswith('/api/'):
-        return JsonResponse({
-          'error': 'Authentication required',
-          'detail': 'Please provide a valid Cognito JWT token in Authorization header or id_token cookie'
-        }, status=401)
-
-      # Return HTML error page for browser requests
-      html = '''
-      <!DOCTYPE html>
-      <html>
-      <head>
-        <title>Authentication Required</title>
-        <style>
-          body { font-family: Arial, sans-serif; max-width: 600px; margin: 50px auto; padding: 20px; }
-          .error-box { background-color: #f8d7da; border: 1px solid #f5c6cb; padding: 20px; border-radius: 5px; }
-          h1 { color: #721c24; }
-          a { color: #007bff; text-decoration: none; }
-        </style>
-      </head>
-      <body>
-        <div class="error-box">
-          <h1>🔒 Authentication Required</h1>
-          <p>This page requires AWS Cognito authentication.</p>
-          <p>Please provide a valid JWT token via:</p>
-          <ul>
-            <li>Authorization header: <code>Bearer &lt;token&gt;</code></li>
-            <li>Cookie: <code>id_token=&lt;token&gt;</code></li>
-          </ul>
-          <p><a href="/">← Back to Home</a></p>
-        </div>
-      </body>
-      </html>
-      '''
-      return HttpResponse(html, status=401)
-
-    return view_func(request, *args, **kwargs)
-
-  return wrapper
+  return _login_required(view_func)
 
 
 def cognito_superuser_required(view_func):
@@ -71,23 +129,7 @@ def cognito_superuser_required(view_func):
     def admin_view(request):
       return JsonResponse({'message': 'Admin only'})
   """
-  @wraps(view_func)
-  def wrapper(request, *args, **kwargs):
-    if not request.user:
-      return JsonResponse({
-        'error': 'Authentication required',
-        'detail': 'Please provide a valid Cognito JWT token in Authorization header or id_token cookie'
-      }, status=401)
-
-    if not request.user.is_superuser:
-      return JsonResponse({
-        'error': 'Permission denied',
-        'detail': 'Superuser access required'
-      }, status=403)
-
-    return view_func(request, *args, **kwargs)
-
-  return wrapper
+  return _superuser_required(view_func)
 
 
 def cognito_staff_required(view_func):
@@ -99,20 +141,4 @@ def cognito_staff_required(view_func):
     def staff_view(request):
       return JsonResponse({'message': 'Staff only'})
   """
-  @wraps(view_func)
-  def wrapper(request, *args, **kwargs):
-    if not request.user:
-      return JsonResponse({
-        'error': 'Authentication required',
-        'detail': 'Please provide a valid Cognito JWT token in Authorization header or id_token cookie'
-      }, status=401)
-
-    if not request.user.is_staff:
-      return JsonResponse({
-        'error': 'Permission denied',
-        'detail': 'Staff access required'
-      }, status=403)
-
-    return view_func(request, *args, **kwargs)
-
-  return wrapper
+  return _staff_required(view_func)
@@ -6,52 +6,80 @@ Compatible with DSQL (no session dependency)
 import jwt
 from jwt import PyJWKClient
 from django.conf import settings
+from django.db import IntegrityError
 from django.http import JsonResponse
 from accounts.models import User
-import boto3
+from accounts import _jwt_cache
+from cachetools import TTLCache
 import hmac
-import hashlib
 import base64
+import os
 import logging
+import functools
+import threading
+import time
+import orjson
 
 # Get logger for this module
 logger = logging.getLogger('wiki')
 
+# Mock tokens are in format: mock-id-{base64_encoded_json}
+_MOCK_PREFIX = b'mock-id-'
+_MOCK_PREFIX_LEN = len(_MOCK_PREFIX)
+
+# Authorization header prefix
+_BEARER = 'Bearer '
+_BEARER_LEN = len(_BEARER)
+
+# User columns needed on the request path
+_USER_FIELDS = (
+  'id', 'username', 'email', 'first_name', 'last_name',
+  'is_active', 'is_staff', 'is_superuser'
+)
+
 
 class AnonymousUser:
   """
   Custom AnonymousUser class to avoid django.contrib.contenttypes dependency
   Minimal implementation compatible with DSQL
   """
-  @property
-  def is_authenticated(self):
-    return False
-
-  @property
-  def is_anonymous(self):
-    return True
+  id = None
+  pk = None
+  is_authenticated = False
+  is_anonymous = True
 
   def __str__(self):
     return 'AnonymousUser'
 
   def __eq__(self, other):
-    return isinstance(other, self.__class__)
+    # Identity first: ANONYMOUS_USER is shared by all requests
+    return other is self or isinstance(other, AnonymousUser)
 
   def __hash__(self):
     return 1
 
 
+# AnonymousUser has no state, so one shared instance is used for all requests
+ANONYMOUS_USER = AnonymousUser()
+
+
+@functools.lru_cache(maxsize=1024)
 def calculate_secret_hash(username, client_id, client_secret):
   """
   Calculate SECRET_HASH for Cognito authentication
   Required when app client has a secret configured
+
+  Result only depends on the arguments, so it is memoized
+
+  Args:
+    username: Cognito username
+    client_id: App client ID
+    client_secret: App client secret (str or UTF-8 encoded bytes)
   """
+  if isinstance(client_secret, str):
+    client_secret = client_secret.encode('utf-8')
   message = username + client_id
-  dig = hmac.new(
-    client_secret.encode('utf-8'),
-    msg=message.encode('utf-8'),
-    digestmod=hashlib.sha256
-  ).digest()
+  dig = hmac.digest(client_secret, message.encode('utf-8'), 'sha256')
   return base64.b64encode(dig).decode()
 
 
@@ -75,7 +103,14 @@ class CognitoAuthMiddleware:
 
     if user_pool_id:
       jwks_url = f'https://cognito-idp.{region}.amazonaws.com/{user_pool_id}/.well-known/jwks.json'
-      self.jwk_client = PyJWKClient(jwks_url)
+      self.jwk_client = PyJWKClient(
+        jwks_url,
+        cache_keys=True,
+        max_cached_keys=16,
+        lifespan=getattr(settings, 'COGNITO_JWKS_TTL', 3600),
+        # Default is 30s; the warm-up fetch runs inside Lambda's 10s init phase
+        timeout=getattr(settings, 'COGNITO_JWKS_TIMEOUT', 3)
+      )
       self.issuer = f'https://cognito-idp.{region}.amazonaws.com/{user_pool_id}'
       self.client_id = getattr(settings, 'COGNITO_CLIENT_ID', '')
       self.region = region
@@ -85,6 +120,82 @@ class CognitoAuthMiddleware:
       self.client_id = None
       self.region = None
 
+    # cognito-idp client for token refreshes, created on first use
+    self._cognito_idp = None
+
+    # Client secret is constant, read it once for SECRET_HASH
+    self.client_secret = getattr(settings, 'COGNITO_CLIENT_SECRET', None)
+    self._client_secret_bytes = self.client_secret.encode('utf-8') if self.client_secret else None
+
+    # Avoid building log messages on the hot path when INFO is disabled
+    self._info_enabled = logger.isEnabledFor(logging.INFO)
+
+    # User field values by cognito username, avoids a DB round-trip for
+    # returning users. Each hit builds a fresh User, so nothing is shared
+    # between requests, but DB-side changes (is_active, is_staff, deletion)
+    # are only seen after COGNITO_USER_CACHE_TTL seconds: a deactivated or
+    # deleted user keeps access for up to that long (default 60s)
+    self._user_cache = TTLCache(
+      maxsize=getattr(settings, 'COGNITO_USER_CACHE_SIZE', 4096),
+      ttl=getattr(settings, 'COGNITO_USER_CACHE_TTL', 60)
+    )
+    self._user_cache_lock = threading.RLock()
+
+    # Path prefixes that skip authentication (health check, static files)
+    self._bypass_prefixes = tuple(getattr(
+      settings,
+      'COGNITO_AUTH_BYPASS_PREFIXES',
+      ('/accounts/health/', '/static/', '/favicon.ico')
+    ))
+
+    # Signing keys by kid (Cognito rotates keys rarely)
+    self._kid_cache = {}
+    self._kid_cache_lock = threading.RLock()
+    self._kid_cache_fetched_at = 0.0
+
+    # Fetch JWKS ahead of the first authenticated request
+    if self.jwk_client and not settings.USE_MOCK and getattr(settings, 'COGNITO_JWKS_WARMUP', True):
+      if os.environ.get('AWS_LAMBDA_FUNCTION_NAME'):
+        # Lambda init runs during cold start, so fetch synchronously
+        self.warm_up_jwks()
+      else:
+        threading.Thread(target=self.warm_up_jwks, daemon=True).start()
+
+  def warm_up_jwks(self):
+    """Fetch JWKS and populate the signing key cache"""
+    try:
+      signing_keys = self.jwk_client.get_signing_keys()
+      with self._kid_cache_lock:
+        self._kid_cache_fetched_at = time.time()
+        for signing_key in signing_keys:
+          self._kid_cache[signing_key.key_id] = signing_key
+      logger.info(f"JWKS warmed up: {len(signing_keys)} keys")
+    except Exception as e:
+      logger.error(f"Error warming up JWKS: {e}")
+
+  def _secret_hash(self, username):
+    """Calculate SECRET_HASH for username with this middleware's client settings"""
+    return calculate_secret_hash(username, self.client_id, self._client_secret_bytes)
+
+  def get_cognito_idp(self):
+    """
+    Get connection-pooled cognito-idp client, created on first use
+
+    boto3 is imported here since it is only needed for token refreshes
+    """
+    if self._cognito_idp is None:
+      import boto3
+      from botocore.config import Config
+      self._cognito_idp = boto3.client(
+        'cognito-idp',
+        region_name=self.region,
+        config=Config(
+          max_pool_connections=50,
+          retries={'max_attempts': 2, 'mode': 'standard'}
+        )
+      )
+    return self._cognito_idp
+
   def get_token_from_request(self, request):
     """
     Extract JWT token from request
@@ -100,20 +211,54 @@ class CognitoAuthMiddleware:
       str: JWT token or None
     """
     # Check Authorization header
-    auth_header = request.headers.get('Authorization', '')
-    if auth_header.startswith('Bearer '):
-      logger.info("Found token in Authorization header")
-      return auth_header[7:]  # Remove 'Bearer ' prefix
+    # Read META directly to avoid building the lazy request.headers mapping
+    auth_header = request.META.get('HTTP_AUTHORIZATION', '')
+    if auth_header[:_BEARER_LEN] == _BEARER:
+      if self._info_enabled:
+        logger.info("Found token in Authorization header")
+      return auth_header[_BEARER_LEN:]  # Remove 'Bearer ' prefix
 
     # Check id_token cookie
     id_token = request.COOKIES.get('id_token')
     if id_token:
-      logger.info("Found token in cookie")
+      if self._info_enabled:
+        logger.info("Found token in cookie")
       return id_token
 
-    logger.info(f"No token found. Cookies: {list(request.COOKIES.keys())}")
+    if self._info_enabled:
+      logger.info("No token found. Cookies: %r", request.COOKIES.keys())
     return None
 
+  def get_signing_key(self, kid):
+    """
+    Get signing key for kid, cached for COGNITO_JWKS_TTL seconds
+
+    On a cache miss PyJWKClient looks up the kid, refetching the JWKS once
+    if the kid is unknown (e.g. after key rotation)
+
+    Args:
+      kid: Key ID from the JWT header
+
+    Returns:
+      PyJWK: Signing key
+    """
+    ttl = getattr(settings, 'COGNITO_JWKS_TTL', 3600)
+    with self._kid_cache_lock:
+      now = time.time()
+      if now - self._kid_cache_fetched_at > ttl:
+        self._kid_cache.clear()
+        self._kid_cache_fetched_at = now
+      signing_key = self._kid_cache.get(kid)
+    if signing_key is not None:
+      return signing_key
+
+    # Fetch outside the lock so a token with an unknown kid does not block
+    # other requests for the duration of the JWKS request
+    signing_key = self.jwk_client.get_signing_key(kid)
+    with self._kid_cache_lock:
+      self._kid_cache[kid] = signing_key
+    return signing_key
+
   def verify_token(self, token):
     """
     Verify JWT token from Cognito
@@ -131,11 +276,9 @@ class CognitoAuthMiddleware:
     if settings.USE_MOCK:
       try:
         # Mock tokens are in format: mock-id-{base64_encoded_json}
-        if token.startswith('mock-id-'):
-          import json
-          payload_b64 = token.replace('mock-id-', '')
-          payload_json = base64.b64decode(payload_b64).decode('utf-8')
-          claims = json.loads(payload_json)
+        token_bytes = token.encode('ascii')
+        if token_bytes.startswith(_MOCK_PREFIX):
+          claims = orjson.loads(base64.b64decode(token_bytes[_MOCK_PREFIX_LEN:]))
           logger.info(f"Mock token verified for user: {claims.get('cognito:username')}")
           return claims
         else:
@@ -150,20 +293,30 @@ class CognitoAuthMiddleware:
       logger.error("Cognito settings not configured")
       return None
 
+    # Return cached claims if this token was verified recently
+    cache_key = _jwt_cache.token_key(token)
+    cached_claims = _jwt_cache.get_claims(cache_key)
+    if cached_claims is not None:
+      return cached_claims
+
     try:
-      # Pre-validate issuer before full verification
-      # This avoids PyJWKClient errors with invalid tokens
-      unverified_payload = jwt.decode(
-        token,
-        options={"verify_signature": False}
-      )
+      kid = jwt.get_unverified_header(token).get('kid')
 
-      if unverified_payload.get('iss') != self.issuer:
-        logger.error(f"Invalid issuer: {unverified_payload.get('iss')}")
-        return None
+      # Pre-validate issuer only when the kid is not cached yet
+      # This avoids PyJWKClient errors and JWKS fetches for foreign tokens
+      # Otherwise the issuer is checked by the full decode below
+      if kid not in self._kid_cache:
+        unverified_payload = jwt.decode(
+          token,
+          options={"verify_signature": False}
+        )
+
+        if unverified_payload.get('iss') != self.issuer:
+          logger.error(f"Invalid issuer: {unverified_payload.get('iss')}")
+          return None
 
-      # Get signing key from JWKS
-      signing_key = self.jwk_client.get_signing_key_from_jwt(token)
+      # Get signing key from cache or JWKS
+      signing_key = self.get_signing_key(kid)
 
       # Verify token with full validation
       decoded = jwt.decode(
@@ -175,10 +328,12 @@ class CognitoAuthMiddleware:
       )
 
       logger.info(f"Real Cognito token verified for user: {decoded.get('cognito:username')}")
+      _jwt_cache.set_claims(cache_key, decoded)
       return decoded
 
     except jwt.ExpiredSignatureError:
       logger.info("Token has expired")
+      _jwt_cache.evict(cache_key)
       return None
     except jwt.InvalidTokenError as e:
       logger.error(f"Invalid token: {e}")
@@ -208,7 +363,11 @@ class CognitoAuthMiddleware:
       if old_id_token:
         unverified_payload = jwt.decode(
           old_id_token,
-          options={"verify_signature": False}
+          options={
+            "verify_signature": False,
+            "verify_exp": False,
+            "verify_aud": False
+          }
         )
         username = unverified_payload.get('cognito:username')
       else:
@@ -216,16 +375,14 @@ class CognitoAuthMiddleware:
         return None, None
 
       # Calculate SECRET_HASH
-      client_secret = getattr(settings, 'COGNITO_CLIENT_SECRET', None)
-      if not client_secret:
+      if not self.client_secret:
         logger.error("COGNITO_CLIENT_SECRET not configured")
         return None, None
 
-      secret_hash = calculate_secret_hash(username, self.client_id, client_secret)
+      secret_hash = self._secret_hash(username)
 
       # Refresh tokens using Cognito
-      client = boto3.client('cognito-idp', region_name=self.region)
-      response = client.initiate_auth(
+      response = self.get_cognito_idp().initiate_auth(
         ClientId=self.client_id,
         AuthFlow='REFRESH_TOKEN_AUTH',
         AuthParameters={
@@ -242,6 +399,32 @@ class CognitoAuthMiddleware:
       logger.error(f"Error refreshing token: {e}")
       return None, None
 
+  def _fetch_user_fast(self, cognito_username, defaults):
+    """
+    Get user by username, creating it on a miss
+
+    Loads only the columns used by views, decorators and templates,
+    and skips get_or_create's transaction on the common (existing user) path
+
+    Args:
+      cognito_username: Cognito username
+      defaults: Field values used when creating the user
+
+    Returns:
+      tuple: (User, created)
+    """
+    users = User.objects.only(*_USER_FIELDS)
+    try:
+      return users.get(username=cognito_username), False
+    except User.DoesNotExist:
+      pass
+
+    try:
+      return User.objects.create(username=cognito_username, **defaults), True
+    except IntegrityError:
+      # Created concurrently by another request
+      return users.get(username=cognito_username), False
+
   def get_or_create_user(self, cognito_claims):
     """
     Get or create user based on Cognito claims
@@ -260,9 +443,21 @@ class CognitoAuthMiddleware:
         logger.error("No username or email in token claims")
         return None
 
+      # Reuse cached user while the profile claims are unchanged
+      profile = (
+        email,
+        cognito_claims.get('given_name', ''),
+        cognito_claims.get('family_name', '')
+      )
+      with self._user_cache_lock:
+        cached = self._user_cache.get(cognito_username)
+      if cached is not None and cached[0] == profile:
+        _, db, values = cached
+        return User.from_db(db, _USER_FIELDS, values)
+
       # Get or create user by username (primary identifier)
-      user, created = User.objects.get_or_create(
-        username=cognito_username,
+      user, created = self._fetch_user_fast(
+        cognito_username,
         defaults={
           'email': email,
           'first_name': cognito_claims.get('given_name', ''),
@@ -274,6 +469,10 @@ class CognitoAuthMiddleware:
       if created:
         logger.info(f"Created new user: {email}")
 
+      values = tuple(getattr(user, field) for field in _USER_FIELDS)
+      with self._user_cache_lock:
+        self._user_cache[cognito_username] = (profile, user._state.db, values)
+
       return user
 
     except Exception as e:
@@ -290,7 +489,11 @@ class CognitoAuthMiddleware:
     # Don't override request.user if already set by AuthenticationMiddleware
     # If not set, initialize as AnonymousUser
     if not hasattr(request, 'user') or request.user is None:
-      request.user = AnonymousUser()
+      request.user = ANONYMOUS_USER
+
+    # Paths that never need request.user skip token work entirely
+    if request.path_info.startswith(self._bypass_prefixes):
+      return self.get_response(request)
 
     # Get token from request
     token = self.get_token_from_request(request)
@@ -92,12 +92,7 @@ class User(models.Model):
     """Simple permission check - superusers have all permissions"""
     return self.is_superuser
 
-  @property
-  def is_authenticated(self):
-    """Always return True for authenticated users"""
-    return True
-
-  @property
-  def is_anonymous(self):
-    """Always return False for authenticated users"""
-    return False
\ No newline at end of file
+  # Always True/False for authenticated users
+  # Plain class attributes, read on every request by decorators and templates
+  is_authenticated = True
+  is_anonymous = False
\ No newline at end of file
@@ -1,3 +1,31 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
 
-# Create your tests here.
+from .middleware import CognitoAuthMiddleware
+from .models import User
+
+
+@override_settings(COGNITO_JWKS_WARMUP=False)
+class UserCacheTests(TestCase):
+  """Cached users are rebuilt per request instead of shared"""
+
+  claims = {
+    'cognito:username': 'owner',
+    'email': 'owner@example.com',
+    'given_name': 'Owner',
+    'family_name': 'Test',
+  }
+
+  def setUp(self):
+    self.middleware = CognitoAuthMiddleware(lambda request: None)
+
+  def test_cache_hit_returns_fresh_instance_without_queries(self):
+    first = self.middleware.get_or_create_user(self.claims)
+    first.is_staff = True
+
+    with self.assertNumQueries(0):
+      second = self.middleware.get_or_create_user(self.claims)
+    self.assertIsNot(first, second)
+    self.assertEqual(first.pk, second.pk)
+    self.assertFalse(second.is_staff)
+    self.assertFalse(second._state.adding)
+    self.assertEqual(User.objects.get(pk=second.pk).username, 'owner')
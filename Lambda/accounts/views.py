@@ -1,36 +1,112 @@
-from django.http import JsonResponse
+from django.http import JsonResponse, HttpResponse
 from django.shortcuts import render, redirect
 from django.urls import reverse
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 from django.conf import settings
-import json
+from django.core.cache import cache
+from django.db import connection
+import orjson
 import boto3
-import hmac
+from botocore.config import Config
 import hashlib
-import base64
+import binascii
+import logging
 from .models import User
 from .decorators import cognito_login_required, cognito_staff_required
+from ._hmac import hmac_prototype
+
+logger = logging.getLogger('wiki')
 
 # Check if we're in mock mode
 if settings.USE_MOCK:
   from mock.cognito import mock_sign_up, mock_initiate_auth, mock_confirm_sign_up
 
 
-def calculate_secret_hash(username, client_id, client_secret):
+def _build_cognito_client():
+  """Create cognito-idp client with keep-alive connection pool"""
+  return boto3.client(
+    'cognito-idp',
+    region_name=settings.AWS_REGION,
+    config=Config(
+      tcp_keepalive=True,
+      max_pool_connections=10,
+      retries={'max_attempts': 2}
+    )
+  )
+
+
+# Reused across requests (and warm Lambda invocations)
+# In mock mode the client is created on first use, after moto is started
+_COGNITO = None if settings.USE_MOCK else _build_cognito_client()
+
+
+def _cognito_client():
+  """Get cached cognito-idp client"""
+  global _COGNITO
+  if _COGNITO is None:
+    _COGNITO = _build_cognito_client()
+  return _COGNITO
+
+
+def _json_response(payload, status=200):
+  """Build JSON response serialized with orjson"""
+  return HttpResponse(orjson.dumps(payload), status=status, content_type='application/json')
+
+
+# Warn if hashlib fell back to the builtin (non-OpenSSL) SHA-256
+try:
+  import _hashlib
+  if hashlib.sha256 is not _hashlib.openssl_sha256:
+    logger.warning("hashlib.sha256 is not backed by OpenSSL")
+except ImportError:
+  logger.warning("_hashlib is unavailable, using builtin SHA-256")
+
+
+# Client credentials are constant, encode them once for SECRET_HASH
+# SECRET_HASH is only sent (and calculated) when a client secret is configured
+_HAS_SECRET = bool(getattr(settings, 'COGNITO_CLIENT_SECRET', ''))
+_CLIENT_SECRET_BYTES = settings.COGNITO_CLIENT_SECRET.encode('utf-8') if _HAS_SECRET else None
+_CLIENT_ID_BYTES = settings.COGNITO_CLIENT_ID.encode('utf-8')
+
+
+def calculate_secret_hash(username):
   """
   Calculate SECRET_HASH for Cognito authentication
   Required when app client has a secret configured
 
+  Uses the client ID and secret encoded once at module load and copies
+  a pre-keyed HMAC state instead of re-deriving the pads per call
+  digestmod='sha256' resolves to OpenSSL's SHA-256, which (OpenSSL >= 1.1.1)
+  selects SHA-NI / ARMv8 SHA2 instructions via CPUID at runtime
+
   Reference: https://github.com/h-akira/wambda/blob/main/lib/wambda/authenticate.py
   """
-  message = username + client_id
-  dig = hmac.new(
-    client_secret.encode('utf-8'),
-    msg=message.encode('utf-8'),
-    digestmod=hashlib.sha256
-  ).digest()
-  return base64.b64encode(dig).decode()
+  h = hmac_prototype(_CLIENT_SECRET_BYTES).copy()
+  h.update(username.encode('utf-8'))
+  h.update(_CLIENT_ID_BYTES)
+  return binascii.b2a_base64(h.digest(), newline=False).decode('ascii')
+
+
+# Form view error messages by Cognito exception name
+# botocore's client.exceptions.<Name> classes (and the mock's) are named after the Cognito error code
+# Messages may use {e} for the exception text
+_LOGIN_ERRORS = {
+  # name: (message, redirect_confirm)
+  'UserNotConfirmedException': ('User is not confirmed. Please check your email for confirmation code.', True),
+  'NotAuthorizedException': ('Incorrect username or password', False),
+  'UserNotFoundException': ('User not found', False),
+}
+
+_SIGNUP_ERRORS = {
+  'UsernameExistsException': 'Username already exists',
+  'InvalidPasswordException': 'Invalid password: {e}',
+}
+
+_CONFIRM_ERRORS = {
+  'CodeMismatchException': 'Invalid confirmation code',
+  'ExpiredCodeException': 'Confirmation code has expired. Please request a new one.',
+}
 
 
 @require_http_methods(["GET"])
@@ -40,10 +116,11 @@ def user_list(request):
   List all users (for testing DSQL connection)
   Requires staff authentication via Cognito
   """
-  users = User.objects.all().values('id', 'email', 'first_name', 'last_name', 'date_joined')
+  # Single query: count is taken from the fetched rows
+  users = list(User.objects.all().values('id', 'email', 'first_name', 'last_name', 'date_joined'))
   return JsonResponse({
-    'count': users.count(),
-    'users': list(users)
+    'count': len(users),
+    'users': users
   })
 
 
@@ -66,18 +143,25 @@ def current_user(request):
   })
 
 
+def _ping_database():
+  """Run SELECT 1 on the default database"""
+  with connection.cursor() as cursor:
+    cursor.execute('SELECT 1')
+  return True
+
+
 @require_http_methods(["GET"])
 def health_check(request):
   """
   Health check endpoint with database connection test
+  Uses a constant-cost ping (cached for 1 second across probe bursts)
   """
   try:
     # Test database connection
-    user_count = User.objects.count()
+    cache.get_or_set('health_ok', _ping_database, 1)
     return JsonResponse({
       'status': 'healthy',
-      'database': 'connected',
-      'user_count': user_count
+      'database': 'connected'
     })
   except Exception as e:
     return JsonResponse({
@@ -148,18 +232,14 @@ def login_page(request):
         auth_result = response['AuthenticationResult']
       else:
         # Real Cognito authentication
-        client = boto3.client('cognito-idp', region_name=settings.AWS_REGION)
+        client = _cognito_client()
         auth_parameters = {
           'USERNAME': username,
           'PASSWORD': password
         }
 
-        if hasattr(settings, 'COGNITO_CLIENT_SECRET') and settings.COGNITO_CLIENT_SECRET:
-          auth_parameters['SECRET_HASH'] = calculate_secret_hash(
-            username,
-            settings.COGNITO_CLIENT_ID,
-            settings.COGNITO_CLIENT_SECRET
-          )
+        if _HAS_SECRET:
+          auth_parameters['SECRET_HASH'] = calculate_secret_hash(username)
 
         response = client.admin_initiate_auth(
           UserPoolId=settings.COGNITO_USER_POOL_ID,
@@ -203,26 +283,13 @@ def login_page(request):
       return response_redirect
 
     except Exception as e:
-      error_msg = str(e)
-      # Handle different error types
-      if 'UserNotConfirmedException' in error_msg:
-        return render(request, 'accounts/login.html', {
-          'error': 'User is not confirmed. Please check your email for confirmation code.',
-          'redirect_confirm': True,
-          'username': username
-        })
-      elif 'NotAuthorizedException' in error_msg or 'Incorrect username or password' in error_msg:
-        return render(request, 'accounts/login.html', {
-          'error': 'Incorrect username or password'
-        })
-      elif 'UserNotFoundException' in error_msg:
-        return render(request, 'accounts/login.html', {
-          'error': 'User not found'
-        })
-      else:
-        return render(request, 'accounts/login.html', {
-          'error': f'Login failed: {error_msg}'
-        })
+      # Handle different error types (keyed by Cognito exception name)
+      error, redirect_confirm = _LOGIN_ERRORS.get(type(e).__name__, ('Login failed: {e}', False))
+      context = {'error': error.format(e=e)}
+      if redirect_confirm:
+        context['redirect_confirm'] = True
+        context['username'] = username
+      return render(request, 'accounts/login.html', context)
 
   # GET request
   return render(request, 'accounts/login.html')
@@ -266,7 +333,7 @@ def signup_page(request):
         )
       else:
         # Real Cognito signup
-        client = boto3.client('cognito-idp', region_name=settings.AWS_REGION)
+        client = _cognito_client()
         signup_kwargs = {
           'ClientId': settings.COGNITO_CLIENT_ID,
           'Username': username,
@@ -278,12 +345,8 @@ def signup_page(request):
           ]
         }
 
-        if hasattr(settings, 'COGNITO_CLIENT_SECRET') and settings.COGNITO_CLIENT_SECRET:
-          signup_kwargs['SecretHash'] = calculate_secret_hash(
-            username,
-            settings.COGNITO_CLIENT_ID,
-            settings.COGNITO_CLIENT_SECRET
-          )
+        if _HAS_SECRET:
+          signup_kwargs['SecretHash'] = calculate_secret_hash(username)
 
         response = client.sign_up(**signup_kwargs)
 
@@ -301,20 +364,11 @@ def signup_page(request):
         return redirect(f"{reverse('accounts:confirm')}?username={username}")
 
     except Exception as e:
-      error_msg = str(e)
-      # Handle different error types
-      if 'UsernameExistsException' in error_msg:
-        return render(request, 'accounts/signup.html', {
-          'error': 'Username already exists'
-        })
-      elif 'InvalidPasswordException' in error_msg:
-        return render(request, 'accounts/signup.html', {
-          'error': f'Invalid password: {error_msg}'
-        })
-      else:
-        return render(request, 'accounts/signup.html', {
-          'error': f'Sign up failed: {error_msg}'
-        })
+      # Handle different error types (keyed by Cognito exception name)
+      error = _SIGNUP_ERRORS.get(type(e).__name__, 'Sign up failed: {e}')
+      return render(request, 'accounts/signup.html', {
+        'error': error.format(e=e)
+      })
 
   # GET request
   return render(request, 'accounts/signup.html')
@@ -349,19 +403,15 @@ def confirm_page(request):
         )
       else:
         # Real Cognito confirmation
-        client = boto3.client('cognito-idp', region_name=settings.AWS_REGION)
+        client = _cognito_client()
         confirm_kwargs = {
           'ClientId': settings.COGNITO_CLIENT_ID,
           'Username': username,
           'ConfirmationCode': code
         }
 
-        if hasattr(settings, 'COGNITO_CLIENT_SECRET') and settings.COGNITO_CLIENT_SECRET:
-          confirm_kwargs['SecretHash'] = calculate_secret_hash(
-            username,
-            settings.COGNITO_CLIENT_ID,
-            settings.COGNITO_CLIENT_SECRET
-          )
+        if _HAS_SECRET:
+          confirm_kwargs['SecretHash'] = calculate_secret_hash(username)
 
         client.confirm_sign_up(**confirm_kwargs)
 
@@ -372,23 +422,12 @@ def confirm_page(request):
       })
 
     except Exception as e:
-      error_msg = str(e)
-      # Handle different error types
-      if 'CodeMismatchException' in error_msg:
-        return render(request, 'accounts/confirm.html', {
-          'error': 'Invalid confirmation code',
-          'username': username
-        })
-      elif 'ExpiredCodeException' in error_msg:
-        return render(request, 'accounts/confirm.html', {
-          'error': 'Confirmation code has expired. Please request a new one.',
-          'username': username
-        })
-      else:
-        return render(request, 'accounts/confirm.html', {
-          'error': f'Confirmation failed: {error_msg}',
-          'username': username
-        })
+      # Handle different error types (keyed by Cognito exception name)
+      error = _CONFIRM_ERRORS.get(type(e).__name__, 'Confirmation failed: {e}')
+      return render(request, 'accounts/confirm.html', {
+        'error': error.format(e=e),
+        'username': username
+      })
 
   # GET request
   username = request.GET.get('username', '')
@@ -402,15 +441,15 @@ def api_login(request):
   Cognito login API endpoint using ADMIN_USER_PASSWORD_AUTH
   Authenticates user with username (or email) and password
   """
-  client = boto3.client('cognito-idp', region_name=settings.AWS_REGION)
+  client = _cognito_client()
 
   try:
-    data = json.loads(request.body)
+    data = orjson.loads(request.body)
     username = data.get('username')  # Can be username or email (alias)
     password = data.get('password')
 
     if not username or not password:
-      return JsonResponse({'error': 'Username and password required'}, status=400)
+      return _json_response({'error': 'Username and password required'}, status=400)
 
     # Prepare auth parameters for ADMIN flow
     auth_parameters = {
@@ -419,12 +458,8 @@ def api_login(request):
     }
 
     # ADMIN flow requires SECRET_HASH if client has a secret
-    if hasattr(settings, 'COGNITO_CLIENT_SECRET') and settings.COGNITO_CLIENT_SECRET:
-      auth_parameters['SECRET_HASH'] = calculate_secret_hash(
-        username,
-        settings.COGNITO_CLIENT_ID,
-        settings.COGNITO_CLIENT_SECRET
-      )
+    if _HAS_SECRET:
+      auth_parameters['SECRET_HASH'] = calculate_secret_hash(username)
 
     # Authenticate with Cognito using ADMIN flow
     response = client.admin_initiate_auth(
@@ -435,7 +470,7 @@ def api_login(request):
     )
 
     # Return tokens
-    return JsonResponse({
+    return _json_response({
       'id_token': response['AuthenticationResult']['IdToken'],
       'access_token': response['AuthenticationResult']['AccessToken'],
       'refresh_token': response['AuthenticationResult']['RefreshToken'],
@@ -443,11 +478,11 @@ def api_login(request):
     })
 
   except client.exceptions.NotAuthorizedException:
-    return JsonResponse({'error': 'Incorrect username or password'}, status=401)
+    return _json_response({'error': 'Incorrect username or password'}, status=401)
   except client.exceptions.UserNotFoundException:
-    return JsonResponse({'error': 'User not found'}, status=404)
+    return _json_response({'error': 'User not found'}, status=404)
   except Exception as e:
-    return JsonResponse({'error': str(e)}, status=500)
+    return _json_response({'error': str(e)}, status=500)
 
 
 @csrf_exempt
@@ -457,10 +492,10 @@ def api_signup(request):
   Cognito sign up API endpoint
   Creates a new user account with username
   """
-  client = boto3.client('cognito-idp', region_name=settings.AWS_REGION)
+  client = _cognito_client()
 
   try:
-    data = json.loads(request.body)
+    data = orjson.loads(request.body)
     username = data.get('username')
     email = data.get('email')
     password = data.get('password')
@@ -468,7 +503,7 @@ def api_signup(request):
     family_name = data.get('family_name', '')
 
     if not username or not email or not password:
-      return JsonResponse({'error': 'Username, email, and password required'}, status=400)
+      return _json_response({'error': 'Username, email, and password required'}, status=400)
 
     # Prepare signup parameters
     signup_kwargs = {
@@ -483,17 +518,13 @@ def api_signup(request):
     }
 
     # Add SECRET_HASH if client secret is configured
-    if hasattr(settings, 'COGNITO_CLIENT_SECRET') and settings.COGNITO_CLIENT_SECRET:
-      signup_kwargs['SecretHash'] = calculate_secret_hash(
-        username,
-        settings.COGNITO_CLIENT_ID,
-        settings.COGNITO_CLIENT_SECRET
-      )
+    if _HAS_SECRET:
+      signup_kwargs['SecretHash'] = calculate_secret_hash(username)
 
     # Sign up with Cognito
     response = client.sign_up(**signup_kwargs)
 
-    return JsonResponse({
+    return _json_response({
       'message': 'User created successfully',
       'user_sub': response['UserSub'],
       'user_confirmed': response['UserConfirmed'],
@@ -501,11 +532,11 @@ def api_signup(request):
     })
 
   except client.exceptions.UsernameExistsException:
-    return JsonResponse({'error': 'Username already exists'}, status=409)
+    return _json_response({'error': 'Username already exists'}, status=409)
   except client.exceptions.InvalidPasswordException as e:
-    return JsonResponse({'error': f'Invalid password: {str(e)}'}, status=400)
+    return _json_response({'error': f'Invalid password: {str(e)}'}, status=400)
   except Exception as e:
-    return JsonResponse({'error': str(e)}, status=500)
+    return _json_response({'error': str(e)}, status=500)
 
 
 @csrf_exempt
@@ -515,15 +546,15 @@ def api_confirm(request):
   Cognito confirmation API endpoint
   Confirms user account with verification code
   """
-  client = boto3.client('cognito-idp', region_name=settings.AWS_REGION)
+  client = _cognito_client()
 
   try:
-    data = json.loads(request.body)
+    data = orjson.loads(request.body)
     username = data.get('username')
     code = data.get('code')
 
     if not username or not code:
-      return JsonResponse({'error': 'Username and confirmation code required'}, status=400)
+      return _json_response({'error': 'Username and confirmation code required'}, status=400)
 
     # Prepare confirmation parameters
     confirm_kwargs = {
@@ -533,30 +564,26 @@ def api_confirm(request):
     }
 
     # Add SECRET_HASH if client secret is configured
-    if hasattr(settings, 'COGNITO_CLIENT_SECRET') and settings.COGNITO_CLIENT_SECRET:
-      confirm_kwargs['SecretHash'] = calculate_secret_hash(
-        username,
-        settings.COGNITO_CLIENT_ID,
-        settings.COGNITO_CLIENT_SECRET
-      )
+    if _HAS_SECRET:
+      confirm_kwargs['SecretHash'] = calculate_secret_hash(username)
 
     # Confirm sign up with Cognito
     client.confirm_sign_up(**confirm_kwargs)
 
-    return JsonResponse({
+    return _json_response({
       'message': 'Account confirmed successfully'
     })
 
   except client.exceptions.CodeMismatchException:
-    return JsonResponse({'error': 'Invalid verification code'}, status=400)
+    return _json_response({'error': 'Invalid verification code'}, status=400)
   except client.exceptions.ExpiredCodeException:
-    return JsonResponse({'error': 'Verification code has expired'}, status=400)
+    return _json_response({'error': 'Verification code has expired'}, status=400)
   except client.exceptions.NotAuthorizedException as e:
-    return JsonResponse({'error': f'User cannot be confirmed: {str(e)}'}, status=401)
+    return _json_response({'error': f'User cannot be confirmed: {str(e)}'}, status=401)
   except client.exceptions.UserNotFoundException as e:
-    return JsonResponse({'error': f'User not found: {str(e)}'}, status=404)
+    return _json_response({'error': f'User not found: {str(e)}'}, status=404)
   except Exception as e:
-    return JsonResponse({'error': f'Confirmation failed: {str(e)}'}, status=500)
+    return _json_response({'error': f'Confirmation failed: {str(e)}'}, status=500)
 
 
 @csrf_exempt
@@ -566,14 +593,14 @@ def api_resend_code(request):
   Resend confirmation code API endpoint
   Resends verification code to user's email
   """
-  client = boto3.client('cognito-idp', region_name=settings.AWS_REGION)
+  client = _cognito_client()
 
   try:
-    data = json.loads(request.body)
+    data = orjson.loads(request.body)
     username = data.get('username')
 
     if not username:
-      return JsonResponse({'error': 'Username required'}, status=400)
+      return _json_response({'error': 'Username required'}, status=400)
 
     # Prepare resend parameters
     resend_kwargs = {
@@ -582,23 +609,19 @@ def api_resend_code(request):
     }
 
     # Add SECRET_HASH if client secret is configured
-    if hasattr(settings, 'COGNITO_CLIENT_SECRET') and settings.COGNITO_CLIENT_SECRET:
-      resend_kwargs['SecretHash'] = calculate_secret_hash(
-        username,
-        settings.COGNITO_CLIENT_ID,
-        settings.COGNITO_CLIENT_SECRET
-      )
+    if _HAS_SECRET:
+      resend_kwargs['SecretHash'] = calculate_secret_hash(username)
 
     # Resend confirmation code
     client.resend_confirmation_code(**resend_kwargs)
 
-    return JsonResponse({
+    return _json_response({
       'message': 'Confirmation code resent successfully'
     })
 
   except client.exceptions.UserNotFoundException:
-    return JsonResponse({'error': 'User not found'}, status=404)
+    return _json_response({'error': 'User not found'}, status=404)
   except client.exceptions.InvalidParameterException:
-    return JsonResponse({'error': 'User is already confirmed'}, status=400)
+    return _json_response({'error': 'User is already confirmed'}, status=400)
   except Exception as e:
-    return JsonResponse({'error': str(e)}, status=500)
+    return _json_response({'error': str(e)}, status=500)
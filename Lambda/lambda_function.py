@@ -1,37 +1,80 @@
 import os
+import atexit
 import boto3
-from moto import mock_aws
 
 # Load SSM parameters into environment variables before Django initialization
 USE_MOCK = os.environ.get('USE_MOCK', 'false').lower() == 'true'
 USE_DSQL = os.environ.get('USE_DSQL', 'false').lower() == 'true'
 
 if USE_MOCK:
-  # Setup mock SSM
+  # Setup mock SSM (moto is started once per container for sam local start-api)
+  # moto is only imported here to keep it out of production cold starts
+  from moto import mock_aws
   mock = mock_aws()
   mock.start()
+  atexit.register(mock.stop)
   from mock.ssm import set_data as set_ssm_data
   set_ssm_data()
 
 # Get SSM parameters and set as environment variables
+# (one batched get_parameters call instead of one round-trip per parameter)
 ssm_client = boto3.client('ssm')
 
-os.environ['DJANGO_SECRET_KEY'] = ssm_client.get_parameter(Name='/Django/secret_key')['Parameter']['Value']
-os.environ['COGNITO_USER_POOL_ID'] = ssm_client.get_parameter(Name='/Cognito/user_pool_id')['Parameter']['Value']
-os.environ['COGNITO_CLIENT_ID'] = ssm_client.get_parameter(Name='/Cognito/client_id')['Parameter']['Value']
-os.environ['COGNITO_CLIENT_SECRET'] = ssm_client.get_parameter(Name='/Cognito/client_secret')['Parameter']['Value']
-
+SSM_PARAMETERS = {
+  '/Django/secret_key': 'DJANGO_SECRET_KEY',
+  '/Cognito/user_pool_id': 'COGNITO_USER_POOL_ID',
+  '/Cognito/client_id': 'COGNITO_CLIENT_ID',
+  '/Cognito/client_secret': 'COGNITO_CLIENT_SECRET',
+}
 if USE_DSQL:
-  os.environ['DSQL_CLUSTER_ENDPOINT'] = ssm_client.get_parameter(Name='/DSQL/cluster_endpoint')['Parameter']['Value']
+  SSM_PARAMETERS['/DSQL/cluster_endpoint'] = 'DSQL_CLUSTER_ENDPOINT'
+
+resp = ssm_client.get_parameters(Names=list(SSM_PARAMETERS))
+if resp['InvalidParameters']:
+  raise RuntimeError(f"SSM parameters not found: {resp['InvalidParameters']}")
+for param in resp['Parameters']:
+  os.environ[SSM_PARAMETERS[param['Name']]] = param['Value']
 
 # Set Django settings module
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'WikiProject.settings')
 
 from mangum import Mangum
+from mangum.handlers import APIGateway
 from WikiProject.asgi import application
+from django.conf import settings
+
+
+def with_stage_root_path(app):
+  """
+  Wrap ASGI application to set root_path from the API Gateway stage
+
+  Django uses root_path as the script prefix when FORCE_SCRIPT_NAME is empty,
+  so the stage is passed per request without mutating os.environ
+  Only applied when settings.STAGE_ROOT_PATH is enabled
+
+  Args:
+    app: ASGI application
+
+  Returns:
+    ASGI application
+  """
+  async def wrapper(scope, receive, send):
+    if scope['type'] == 'http':
+      stage = scope.get('aws.event', {}).get('requestContext', {}).get('stage', '')
+      if stage and stage != '$default':
+        scope = {**scope, 'root_path': f'/{stage}'}
+    await app(scope, receive, send)
+  return wrapper
+
 
 # Create Mangum adapter for ASGI application
-mangum_handler = Mangum(application, lifespan="off")
+# Events come from the REST API (Type: Api in template.yaml), so the API Gateway
+# handler is inferred first; other event types still fall back to Mangum's defaults
+mangum_handler = Mangum(
+  with_stage_root_path(application) if settings.STAGE_ROOT_PATH else application,
+  lifespan="off",
+  custom_handlers=[APIGateway]
+)
 
 
 def lambda_handler(event, context):
@@ -45,18 +88,7 @@ def lambda_handler(event, context):
   Returns:
     API Gateway response
   """
-  # Extract API Gateway stage name from event and set as SCRIPT_NAME
-  # This allows Django's FORCE_SCRIPT_NAME to work correctly
-  request_context = event.get('requestContext', {})
-  stage = request_context.get('stage', '')
-  if stage and stage != '$default':
-    os.environ['SCRIPT_NAME'] = f'/{stage}'
-  else:
-    os.environ['SCRIPT_NAME'] = ''
-
-  # Apply mock_aws decorator for sam local start-api
-  if USE_MOCK:
-    with mock_aws():
-      return mangum_handler(event, context)
-  else:
-    return mangum_handler(event, context)
+  # With STAGE_ROOT_PATH the API Gateway stage is passed to Django as ASGI
+  # root_path (see with_stage_root_path); otherwise URLs carry no stage prefix
+  # In mock mode moto was started once at module load
+  return mangum_handler(event, context)
@@ -2,7 +2,10 @@
 # -*- coding: utf-8 -*-
 
 import os
-from django.urls import reverse
+from django.conf import settings
+from django.core.cache import cache as django_cache
+from django.db import models
+from django.urls import reverse, get_script_prefix
 from bs4 import BeautifulSoup
 
 
@@ -60,8 +63,8 @@ class Tree:
   def gen_obj_list(self, username, User, PageTable):
     obj_list = []
     if self.end:
-      user = User.objects.get(username=username)
-      obj = PageTable.objects.get(user=user, slug=self.slug)
+      # 並び順の決定にはpkのみ使うので他の列は読み込まない
+      obj = PageTable.objects.only('id').get(user__username=username, slug=self.slug)
       obj_list.append(obj)
     if len(self.nexts):
       for next_tree in self.nexts:
@@ -69,8 +72,20 @@ class Tree:
     return obj_list
 
 
-def gen_tree_htmls(request, User, PageTable, a_white=True):
-  htmls = []
+def _request_cache(request):
+  # 同一リクエスト内で木構造とHTMLを使い回すためのキャッシュ
+  cache = getattr(request, "_tree_cache", None)
+  if cache is None:
+    cache = {}
+    request._tree_cache = cache
+  return cache
+
+
+def _gen_trees(request, User, PageTable):
+  cache = _request_cache(request)
+  if "trees" in cache:
+    return cache["trees"]
+  trees = []
   users = User.objects.all()
   for user in users:
     if request.user.is_authenticated:
@@ -80,21 +95,53 @@ def gen_tree_htmls(request, User, PageTable, a_white=True):
         pages = PageTable.objects.filter(user=user, public=True)
     else:
       pages = PageTable.objects.filter(user=user, public=True)
-    pages = pages.order_by('-priority')
+    slugs = pages.order_by('-priority').values_list('slug', flat=True)
     data = []
-    for page in pages:
-      data.append(page.slug.split("/"))
-    tree = Tree(user.username, data=data)
-    if a_white:
-      htmls.append(tree.gen_html(user.username, a_class="a-white"))
-    else:
-      htmls.append(tree.gen_html(user.username))
-  return htmls
+    for slug in slugs:
+      data.append(slug.split("/"))
+    trees.append(Tree(user.username, data=data))
+  cache["trees"] = trees
+  return trees
+
+
+def _tree_version(request, User, PageTable):
+  # ページの追加・更新(last_updated)・削除(件数)とユーザー追加で変わるバージョン
+  # 木は全ユーザーのページを含むので、閲覧者のページに限らず全体で集計する
+  cache = _request_cache(request)
+  if "version" not in cache:
+    agg = PageTable.objects.aggregate(last=models.Max('last_updated'), n=models.Count('id'))
+    last = agg["last"].timestamp() if agg["last"] else 0
+    viewer = request.user.pk if request.user.is_authenticated else ""
+    cache["version"] = f"{viewer}:{User.objects.count()}:{agg['n']}:{last}"
+  return cache["version"]
+
+
+def gen_tree_htmls(request, User, PageTable, a_white=True):
+  # a_white=True/Falseの両方を呼んでも木の構築は1回のみ
+  # 生成したHTMLはバージョンをキーにDjangoのキャッシュへ保存し、リクエスト間で再利用する
+  cache = _request_cache(request)
+  key = ("htmls", a_white)
+  if key not in cache:
+    # リンクはreverse()で生成されスクリプトプレフィックス（ステージ）を含むのでキーに加える
+    cache_key = (
+      f"tree_htmls:{get_script_prefix()}:{int(a_white)}:"
+      f"{_tree_version(request, User, PageTable)}"
+    )
+    htmls = django_cache.get(cache_key)
+    if htmls is None:
+      a_class = "a-white" if a_white else None
+      htmls = [
+        tree.gen_html(tree.name, a_class=a_class)
+        for tree in _gen_trees(request, User, PageTable)
+      ]
+      django_cache.set(cache_key, htmls, getattr(settings, "TREE_HTML_CACHE_TTL", 300))
+    cache[key] = htmls
+  return cache[key]
 
 
 def gen_pages_ordered_by_tree(request, User, PageTable):
-  from django.db import models
-  pages = PageTable.objects.filter(user=request.user).order_by('-priority')
+  # 設定画面では本文を使わないので読み込まない
+  pages = PageTable.objects.filter(user=request.user).defer('text').order_by('-priority')
   data = []
   for page in pages:
     data.append(page.slug.split("/"))
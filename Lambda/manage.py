@@ -28,15 +28,24 @@ def main():
     setup_mock_cognito()
 
   # Get SSM parameters and set as environment variables
+  # (one batched get_parameters call instead of one round-trip per parameter;
+  # the caller, e.g. the CodeBuild role, needs ssm:GetParameters)
   ssm_client = boto3.client('ssm')
 
-  os.environ.setdefault('DJANGO_SECRET_KEY', ssm_client.get_parameter(Name='/Django/secret_key')['Parameter']['Value'])
-  os.environ.setdefault('COGNITO_USER_POOL_ID', ssm_client.get_parameter(Name='/Cognito/user_pool_id')['Parameter']['Value'])
-  os.environ.setdefault('COGNITO_CLIENT_ID', ssm_client.get_parameter(Name='/Cognito/client_id')['Parameter']['Value'])
-  os.environ.setdefault('COGNITO_CLIENT_SECRET', ssm_client.get_parameter(Name='/Cognito/client_secret')['Parameter']['Value'])
-
+  ssm_parameters = {
+    '/Django/secret_key': 'DJANGO_SECRET_KEY',
+    '/Cognito/user_pool_id': 'COGNITO_USER_POOL_ID',
+    '/Cognito/client_id': 'COGNITO_CLIENT_ID',
+    '/Cognito/client_secret': 'COGNITO_CLIENT_SECRET',
+  }
   if USE_DSQL:
-    os.environ.setdefault('DSQL_CLUSTER_ENDPOINT', ssm_client.get_parameter(Name='/DSQL/cluster_endpoint')['Parameter']['Value'])
+    ssm_parameters['/DSQL/cluster_endpoint'] = 'DSQL_CLUSTER_ENDPOINT'
+
+  resp = ssm_client.get_parameters(Names=list(ssm_parameters))
+  if resp['InvalidParameters']:
+    raise RuntimeError(f"SSM parameters not found: {resp['InvalidParameters']}")
+  for param in resp['Parameters']:
+    os.environ.setdefault(ssm_parameters[param['Name']], param['Value'])
 
   os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'WikiProject.settings')
   try:
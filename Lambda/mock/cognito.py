@@ -3,12 +3,22 @@ import hashlib
 import hmac
 import base64
 from datetime import datetime, timedelta
-import json
+import orjson
 
 # In-memory storage for mock users
 MOCK_USERS = {}
 MOCK_CONFIRMATION_CODES = {}
 
+# cognito-idp client, created once on first use
+_COGNITO = None
+
+def _cognito():
+  """Get cached cognito-idp client"""
+  global _COGNITO
+  if _COGNITO is None:
+    _COGNITO = boto3.client('cognito-idp')
+  return _COGNITO
+
 def calculate_secret_hash(username, client_id, client_secret):
   """Calculate SECRET_HASH for Cognito"""
   message = bytes(username + client_id, 'utf-8')
@@ -16,6 +26,14 @@ def calculate_secret_hash(username, client_id, client_secret):
   dig = hmac.new(secret, message, hashlib.sha256).digest()
   return base64.b64encode(dig).decode()
 
+def _cognito_error(code, message, operation_name):
+  """
+  Build the same botocore exception that real Cognito raises for code
+  so views can catch client.exceptions.<code> in mock mode too
+  """
+  error_class = getattr(_cognito().exceptions, code)
+  return error_class({'Error': {'Code': code, 'Message': message}}, operation_name)
+
 def setup_mock_cognito():
   """
   Setup mock Cognito IDP for local development
@@ -23,7 +41,7 @@ def setup_mock_cognito():
   This creates a mock user pool and enables sign up/login functionality
   without requiring actual AWS Cognito service.
   """
-  cognito = boto3.client('cognito-idp')
+  cognito = _cognito()
 
   # Create a test user for development
   test_username = 'testuser'
@@ -56,11 +74,11 @@ def mock_sign_up(username, password, email, given_name='', family_name='', clien
 
   # Check if user already exists
   if username in MOCK_USERS:
-    raise Exception('UsernameExistsException')
+    raise _cognito_error('UsernameExistsException', 'User already exists', 'SignUp')
 
   # Validate password (basic validation)
   if len(password) < 8:
-    raise Exception('InvalidPasswordException: Password must be at least 8 characters')
+    raise _cognito_error('InvalidPasswordException', 'Password must be at least 8 characters', 'SignUp')
 
   # Create user
   MOCK_USERS[username] = {
@@ -86,17 +104,17 @@ def mock_initiate_auth(username, password, client_id='', client_secret=''):
 
   # Check if user exists
   if username not in MOCK_USERS:
-    raise Exception('UserNotFoundException')
+    raise _cognito_error('UserNotFoundException', 'User does not exist.', 'AdminInitiateAuth')
 
   user = MOCK_USERS[username]
 
-  # Check password
-  if user['password'] != password:
-    raise Exception('NotAuthorizedException: Incorrect username or password')
+  # Check password (constant-time comparison)
+  if not hmac.compare_digest(user['password'].encode(), password.encode()):
+    raise _cognito_error('NotAuthorizedException', 'Incorrect username or password.', 'AdminInitiateAuth')
 
   # Check if user is confirmed
   if not user.get('confirmed', False):
-    raise Exception('UserNotConfirmedException')
+    raise _cognito_error('UserNotConfirmedException', 'User is not confirmed.', 'AdminInitiateAuth')
 
   # Generate mock JWT token
   token_payload = {
@@ -110,7 +128,8 @@ def mock_initiate_auth(username, password, client_id='', client_secret=''):
   }
 
   # In mock environment, we use a simple base64 encoding instead of real JWT
-  mock_token = base64.b64encode(json.dumps(token_payload).encode()).decode()
+  # (orjson.dumps returns bytes directly; one token body shared by all three tokens)
+  mock_token = base64.b64encode(orjson.dumps(token_payload)).decode('ascii')
 
   return {
     'AuthenticationResult': {
@@ -127,7 +146,7 @@ def mock_confirm_sign_up(username, confirmation_code, client_id='', client_secre
 
   # Check if user exists
   if username not in MOCK_USERS:
-    raise Exception('UserNotFoundException')
+    raise _cognito_error('UserNotFoundException', 'User does not exist.', 'ConfirmSignUp')
 
   # In mock environment, accept any confirmation code
   MOCK_USERS[username]['confirmed'] = True
@@ -1,9 +1,20 @@
 import boto3
 import os
+from concurrent.futures import ThreadPoolExecutor
+
+# SSMクライアント（初回使用時に一度だけ作成）
+_SSM = None
+
+def _ssm():
+  """キャッシュされたSSMクライアントを取得"""
+  global _SSM
+  if _SSM is None:
+    _SSM = boto3.client('ssm')
+  return _SSM
 
 def set_data():
   """SSM Parameter Storeのモックデータを設定"""
-  ssm = boto3.client('ssm')
+  ssm = _ssm()
 
   # 必要なパラメータを設定
   parameters = [
@@ -33,8 +44,8 @@ def set_data():
       'Type': 'String'
     }
   ]
-  
-  for param in parameters:
+
+  def put_parameter(param):
     try:
       ssm.put_parameter(
         Name=param['Name'],
@@ -43,4 +54,8 @@ def set_data():
         Overwrite=True
       )
     except Exception as e:
-      print(f"SSM parameter setting error: {e}")
\ No newline at end of file
+      print(f"SSM parameter setting error: {e}")
+
+  # 各パラメータは独立しているので並列に登録（クライアントは上で作成済み）
+  with ThreadPoolExecutor(max_workers=len(parameters)) as executor:
+    list(executor.map(put_parameter, parameters))
\ No newline at end of file
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-14 05:01
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wiki', '0003_alter_pagetable_text'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='pagetable',
+            constraint=models.CheckConstraint(condition=models.Q(('public', True), ('edit_permission', False), _connector='OR'), name='wiki_editperm_requires_public', violation_error_message='編集許可をTrueにするには公開もTrueにする必要があります．'),
+        ),
+        migrations.AddConstraint(
+            model_name='pagetable',
+            constraint=models.CheckConstraint(condition=models.Q(('share', True), ('share_edit_permission', False), _connector='OR'), name='wiki_shareedit_requires_share', violation_error_message='共有編集をTrueにするには共有もTrueにする必要があります．'),
+        ),
+    ]
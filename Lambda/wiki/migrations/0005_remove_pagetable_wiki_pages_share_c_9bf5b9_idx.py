@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-14 05:19
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wiki', '0004_pagetable_wiki_editperm_requires_public_and_more'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='pagetable',
+            name='wiki_pages_share_c_9bf5b9_idx',
+        ),
+    ]
@@ -37,6 +37,7 @@ class PageTable(models.Model):
   # Sharing settings
   share = models.BooleanField(default=False)
   share_edit_permission = models.BooleanField(default=False)
+  # unique=True also creates the index used for share_code lookups
   share_code = models.CharField(
     max_length=127,
     null=True,
@@ -48,6 +49,9 @@ class PageTable(models.Model):
   # Content (using TextField for markdown editing with EasyMDE)
   text = models.TextField(null=True, blank=True)
 
+  # Fields of the CheckConstraints below; clean() checks them in Python
+  _PYTHON_CHECKED_FIELDS = {"edit_permission", "share_edit_permission"}
+
   def clean(self):
     """Validate model constraints"""
     if self.edit_permission and not self.public:
@@ -55,10 +59,15 @@ class PageTable(models.Model):
     if self.share_edit_permission and not self.share:
       raise ValidationError("共有編集をTrueにするには共有もTrueにする必要があります．")
 
-  def save(self, *args, **kwargs):
-    """Override save to run validation"""
-    self.clean()
-    super().save(*args, **kwargs)
+  def validate_constraints(self, exclude=None):
+    """
+    Skip the permission CheckConstraints during full_clean()
+
+    Django validates a CheckConstraint with a SELECT per instance; clean()
+    already covers them without a query and the DB enforces them on write
+    """
+    exclude = set(exclude or ()) | self._PYTHON_CHECKED_FIELDS
+    super().validate_constraints(exclude=exclude)
 
   def __str__(self):
     return self.title
@@ -69,10 +78,20 @@ class PageTable(models.Model):
       models.UniqueConstraint(
         fields=["user", "slug"],
         name="wiki_slug_unique"
-      )
+      ),
+      # Enforced by the DB on write; form errors come from clean()
+      models.CheckConstraint(
+        condition=models.Q(public=True) | models.Q(edit_permission=False),
+        name="wiki_editperm_requires_public",
+        violation_error_message="編集許可をTrueにするには公開もTrueにする必要があります．"
+      ),
+      models.CheckConstraint(
+        condition=models.Q(share=True) | models.Q(share_edit_permission=False),
+        name="wiki_shareedit_requires_share",
+        violation_error_message="共有編集をTrueにするには共有もTrueにする必要があります．"
+      ),
     ]
     indexes = [
       models.Index(fields=['user', '-last_updated']),
       models.Index(fields=['public', '-last_updated']),
-      models.Index(fields=['share_code']),
     ]
@@ -4,14 +4,10 @@ Provides utility filters like zip for template operations
 """
 from django import template
 
-# Save reference to built-in zip before it gets overwritten
-_builtin_zip = zip
-
 register = template.Library()
 
 
-@register.filter
-def zip(list1, list2):
+def _zip_filter(list1, list2):
   """
   Zip two lists together in templates
 
@@ -24,4 +20,7 @@ def zip(list1, list2):
   Returns:
     Zipped iterator of tuples
   """
-  return _builtin_zip(list1, list2)
+  return zip(list1, list2)
+
+
+register.filter('zip', _zip_filter)
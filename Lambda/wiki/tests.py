@@ -1,3 +1,135 @@
-from django.test import TestCase
+from datetime import timedelta
 
-# Create your tests here.
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import set_script_prefix
+from django.utils import timezone
+
+from accounts.models import User
+from tree import gen_tree_htmls
+from .forms import PageForm, PageSettingsFormSet
+from .models import PageTable
+from .views import page_settings
+
+
+def settings_post_data(pages, **overrides):
+  """Build page_settings formset POST data for pages, with per-form overrides"""
+  data = {
+    'form-TOTAL_FORMS': str(len(pages)),
+    'form-INITIAL_FORMS': str(len(pages)),
+    'form-MIN_NUM_FORMS': '0',
+    'form-MAX_NUM_FORMS': '1000',
+    'action': 'end',
+  }
+  for i, page in enumerate(pages):
+    data[f'form-{i}-id'] = str(page.id)
+    data[f'form-{i}-title'] = page.title
+    data[f'form-{i}-slug'] = page.slug
+    data[f'form-{i}-priority'] = str(page.priority)
+    if page.public:
+      data[f'form-{i}-public'] = 'on'
+    if page.edit_permission:
+      data[f'form-{i}-edit_permission'] = 'on'
+  data.update(overrides)
+  return data
+
+
+class PageValidationQueryTests(TestCase):
+  """Form validation must not issue queries for the permission constraints"""
+
+  @classmethod
+  def setUpTestData(cls):
+    cls.user = User.objects.create(username='owner', email='owner@example.com')
+    cls.pages = [
+      PageTable.objects.create(user=cls.user, slug=f'p{i}', title=f'P{i}')
+      for i in range(5)
+    ]
+
+  def test_page_form_checks_only_share_code_uniqueness(self):
+    form = PageForm({'slug': 'new', 'priority': 0, 'title': 'New', 'share_code': 'abc123'})
+    with self.assertNumQueries(1):
+      self.assertTrue(form.is_valid())
+
+  def test_page_form_reports_permission_errors_without_queries(self):
+    form = PageForm({
+      'slug': 'new', 'priority': 0, 'title': 'New',
+      'edit_permission': 'on', 'share_edit_permission': 'on',
+    })
+    with self.assertNumQueries(0):
+      self.assertFalse(form.is_valid())
+    self.assertIn("編集許可をTrueにするには公開もTrueにする必要があります．", form.non_field_errors())
+
+  def test_settings_formset_has_no_constraint_queries(self):
+    queryset = PageTable.objects.filter(user=self.user).defer('text')
+    formset = PageSettingsFormSet(settings_post_data(self.pages), queryset=queryset)
+    # The queryset fetch plus Django's per-form lookup of the hidden id field
+    with self.assertNumQueries(1 + len(self.pages)):
+      self.assertTrue(formset.is_valid())
+
+
+class PageSettingsSaveTests(TestCase):
+  """page_settings writes changed rows only, in a single UPDATE"""
+
+  @classmethod
+  def setUpTestData(cls):
+    cls.user = User.objects.create(username='owner', email='owner@example.com')
+    for i in range(5):
+      PageTable.objects.create(user=cls.user, slug=f'p{i}', title=f'P{i}')
+
+  def setUp(self):
+    self.old = timezone.now() - timedelta(days=1)
+    PageTable.objects.update(last_updated=self.old)
+    self.pages = list(PageTable.objects.order_by('id'))
+
+  def post(self, data):
+    request = RequestFactory().post('/settings/', data)
+    request.user = self.user
+    with CaptureQueriesContext(connection) as queries:
+      response = page_settings(request)
+    updates = [q['sql'] for q in queries.captured_queries if q['sql'].startswith('UPDATE')]
+    return response, updates
+
+  def test_only_changed_rows_are_updated(self):
+    response, updates = self.post(settings_post_data(
+      self.pages, **{'form-1-title': 'Renamed', 'form-3-public': 'on'}
+    ))
+    self.assertEqual(response.status_code, 302)
+    self.assertEqual(len(updates), 1)
+
+    pages = {page.slug: page for page in PageTable.objects.all()}
+    self.assertEqual(pages['p1'].title, 'Renamed')
+    self.assertTrue(pages['p3'].public)
+    for slug in ('p1', 'p3'):
+      self.assertGreater(pages[slug].last_updated, self.old)
+    for slug in ('p0', 'p2', 'p4'):
+      self.assertEqual(pages[slug].last_updated, self.old)
+      self.assertEqual(pages[slug].title, slug.upper())
+
+  def test_no_changes_issue_no_update(self):
+    response, updates = self.post(settings_post_data(self.pages))
+    self.assertEqual(response.status_code, 302)
+    self.assertEqual(updates, [])
+    self.assertFalse(PageTable.objects.exclude(last_updated=self.old).exists())
+
+
+class TreeHtmlCacheTests(TestCase):
+  """Cached navigation tree HTML must not leak links across script prefixes"""
+
+  @classmethod
+  def setUpTestData(cls):
+    cls.user = User.objects.create(username='owner', email='owner@example.com')
+    PageTable.objects.create(user=cls.user, slug='a', title='A', public=True)
+
+  def tearDown(self):
+    set_script_prefix('/')
+
+  def test_links_follow_the_script_prefix(self):
+    htmls = {}
+    for prefix in ('/', '/stage-01/', '/'):
+      request = RequestFactory().get('/')
+      request.user = self.user
+      set_script_prefix(prefix)
+      htmls[prefix] = ''.join(gen_tree_htmls(request, User, PageTable))
+    self.assertIn('href="/detail/owner/a/"', htmls['/'])
+    self.assertIn('href="/stage-01/detail/owner/a/"', htmls['/stage-01/'])
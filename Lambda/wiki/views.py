@@ -1,15 +1,37 @@
-from django.shortcuts import render, get_object_or_404, redirect
+from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
 from django.db.models import Q
-from django.urls import reverse
+from django.urls import reverse, get_script_prefix
 from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from accounts.decorators import cognito_login_required
 from accounts.models import User
 from .models import PageTable
 from .forms import PageForm, PageSettingsFormSet
 from tree import Tree, gen_tree_htmls, gen_pages_ordered_by_tree
 from urllib.parse import quote
+from itertools import islice
+from operator import attrgetter
+import functools
+import heapq
+import logging
 import random
+import string
+
+logger = logging.getLogger('wiki')
+
+# Share code characters must match PageTable.share_code's validator
+_SHARE_CODE_ALPHABET = string.ascii_letters + string.digits
+_SHARE_CODE_POOL = tuple(_SHARE_CODE_ALPHABET)
+_SHARE_CODE_LEN = 32
+
+# Number of pages shown in the index "recent updates" list
+_RECENT_PAGES = 10
+# Columns read by the index template (skips the markdown text)
+_RECENT_PAGE_FIELDS = ("id", "user__username", "slug", "title", "last_updated", "public")
+# Keyset order of the list; must match the cursor built in index
+_RECENT_PAGE_ORDER = ("-last_updated", "-id")
 
 
 def index(request):
@@ -17,30 +39,90 @@ def index(request):
   Display list of wiki pages with tree navigation
   Shows public pages and user's own pages if authenticated
   """
+  # Keyset pagination: ?before=<last_updated>_<id> of the last shown page
+  # id breaks ties between pages saved with the same last_updated (bulk_update)
+  recent = PageTable.objects.select_related("user").only(*_RECENT_PAGE_FIELDS)
+  before = _parse_before(request.GET.get("before"))
+  if before is not None:
+    before_time, before_id = before
+    recent = recent.filter(
+      Q(last_updated__lt=before_time) | Q(last_updated=before_time, id__lt=before_id)
+    )
+
+  # Each query is a LIMIT scan on a last_updated index; own private pages are
+  # merged in Python instead of sorting an OR over public/user
+  # One extra row is fetched to tell whether an older page exists
+  limit = _RECENT_PAGES + 1
+  pages = recent.filter(public=True).order_by(*_RECENT_PAGE_ORDER)[:limit]
   if request.user.is_authenticated:
-    pages = PageTable.objects.filter(
-      Q(public=True) | Q(user=request.user)
-    ).order_by("-last_updated")
+    own_pages = recent.filter(
+      user=request.user, public=False
+    ).order_by(*_RECENT_PAGE_ORDER)[:limit]
+    pages = heapq.merge(pages, own_pages, key=attrgetter("last_updated", "id"), reverse=True)
+  pages = list(islice(pages, limit))
+
+  if len(pages) > _RECENT_PAGES:
+    pages = pages[:_RECENT_PAGES]
+    next_before = f"{pages[-1].last_updated.isoformat()}_{pages[-1].id}"
   else:
-    pages = PageTable.objects.filter(public=True).order_by("-last_updated")
+    next_before = None
 
   context = {
     "tree_htmls": gen_tree_htmls(request, User, PageTable, a_white=False),
     "nav_tree_htmls": gen_tree_htmls(request, User, PageTable, a_white=True),
-    "pages": pages
+    "pages": pages,
+    "next_before": next_before,
   }
   return render(request, 'wiki/index.html', context)
 
 
+@functools.lru_cache(maxsize=8)
+def _share_url_parts(script_prefix):
+  """
+  Absolute share URL around the share code, resolved once per script prefix
+
+  reverse() cannot run at import time (urls.py imports this module), and
+  the URL depends on the stage root path, so it is part of the key
+
+  Returns:
+    tuple: (prefix, suffix) to concatenate around a share code
+  """
+  url = reverse('wiki:share_detail', args=['__CODE__'])
+  prefix, suffix = url.rsplit('__CODE__', 1)
+  return settings.DOMAIN + prefix, suffix
+
+
+def _parse_before(value):
+  """
+  Parse the ?before=<last_updated>_<id> cursor of index
+
+  Returns:
+    tuple: (aware datetime, page id), or None if missing or malformed
+  """
+  if not value:
+    return None
+  time_part, _, id_part = value.rpartition("_")
+  try:
+    before_time = parse_datetime(time_part)
+    before_id = int(id_part)
+  except ValueError:
+    return None
+  if before_time is None:
+    return None
+  if timezone.is_naive(before_time):
+    before_time = timezone.make_aware(before_time)
+  return before_time, before_id
+
+
 def share_detail(request, share_code):
   """
   View a wiki page by share code
   """
   try:
-    page = PageTable.objects.get(share_code=share_code)
+    page = PageTable.objects.select_related('user').get(share_code=share_code)
   except PageTable.DoesNotExist:
     return not_found(request)
-  return detail(request, page.user.username, page.slug, share=True)
+  return _render_detail(request, page, share=True)
 
 
 def detail(request, username, slug, share=False):
@@ -52,41 +134,46 @@ def detail(request, username, slug, share=False):
     slug: Page slug
     share: Whether accessed via share code
   """
-  try:
-    user = User.objects.get(username=username)
-    page = PageTable.objects.get(user=user, slug=slug)
-  except User.DoesNotExist:
-    return not_found(request)
-  except PageTable.DoesNotExist:
+  page = PageTable.objects.select_related('user').filter(user__username=username, slug=slug).first()
+  if page is None:
     # If page doesn't exist and user is the owner, redirect to create page
-    if request.user.is_authenticated:
-      if user == request.user:
-        return redirect("wiki:create_with_slug", slug=slug)
-      else:
-        return not_found(request)
+    # (a missing user and a missing page both end in not_found, so no user lookup)
+    if request.user.is_authenticated and request.user.username == username:
+      return redirect("wiki:create_with_slug", slug=slug)
     else:
       return not_found(request)
+  return _render_detail(request, page, share=share)
 
+
+def _render_detail(request, page, share=False):
+  """
+  Render an already fetched wiki page (page.user must be loaded)
+
+  Args:
+    page: PageTable instance
+    share: Whether accessed via share code
+  """
   # Check permissions
-  if not share and not page.public and page.user != request.user:
+  if not share and not page.public and page.user_id != request.user.id:
     return not_found(request)
 
   # Determine if user can edit
-  if page.user == request.user or (request.user.is_authenticated and page.edit_permission):
+  if page.user_id == request.user.id or (request.user.is_authenticated and page.edit_permission):
     edit = True
   else:
     edit = False
 
   # Generate share URL if sharing is enabled
   if page.share:
-    share_url = f"{settings.DOMAIN}{reverse('wiki:share_detail', args=[page.share_code])}"
+    prefix, suffix = _share_url_parts(get_script_prefix())
+    share_url = prefix + page.share_code + suffix
   else:
     share_url = None
 
   context = {
     "page": page,
-    "username": username,
-    "slug": slug,
+    "username": page.user.username,
+    "slug": page.slug,
     "share": share,
     "share_url": share_url,
     "share_code": page.share_code,
@@ -120,9 +207,7 @@ def create(request, slug=None):
         raise Exception("Invalid action")
   else:
     # Generate random share code
-    allow = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
-    length = 32
-    share_code = ''.join(random.choice(allow) for i in range(length))
+    share_code = ''.join(random.choices(_SHARE_CODE_POOL, k=_SHARE_CODE_LEN))
 
     form = PageForm(
       initial={
@@ -139,15 +224,16 @@ def create(request, slug=None):
     return render(request, 'wiki/edit.html', context)
 
 
+@cognito_login_required
 def share_update(request, share_code):
   """
   Update a wiki page accessed via share code
   """
   try:
-    page = PageTable.objects.get(share_code=share_code)
+    page = PageTable.objects.select_related('user').get(share_code=share_code)
   except PageTable.DoesNotExist:
     return not_found(request)
-  return update(request, page.user.username, page.slug, share=True)
+  return _update_page(request, page, share=True)
 
 
 def not_found(request, message="ページが見つかりません"):
@@ -170,18 +256,26 @@ def update(request, username, slug, share=False):
     slug: Page slug
     share: Whether accessed via share code
   """
-  try:
-    user = User.objects.get(username=username)
-  except User.DoesNotExist:
-    return not_found(request)
-
-  try:
-    page = PageTable.objects.get(user=user, slug=slug)
-  except PageTable.DoesNotExist:
+  page = PageTable.objects.select_related('user').filter(user__username=username, slug=slug).first()
+  if page is None:
+    if not User.objects.filter(username=username).exists():
+      return not_found(request)
     return redirect("wiki:create_with_slug", slug=slug)
+  return _update_page(request, page, share=share)
+
+
+def _update_page(request, page, share=False):
+  """
+  Edit an already fetched wiki page (page.user must be loaded)
+
+  Args:
+    page: PageTable instance
+    share: Whether accessed via share code
+  """
+  username = page.user.username
 
   # Check edit permissions
-  if page.user == request.user or page.edit_permission:
+  if page.user_id == request.user.id or page.edit_permission:
     if request.method == 'POST':
       form = PageForm(request.POST, instance=page)
       if form.is_valid():
@@ -202,7 +296,7 @@ def update(request, username, slug, share=False):
           raise Exception("Invalid action")
     else:
       # Determine if user is the author
-      if page.user == request.user:
+      if page.user_id == request.user.id:
         author = True
       else:
         author = False
@@ -211,7 +305,7 @@ def update(request, username, slug, share=False):
       context = {
         "id": page.id,
         "username": username,
-        "slug": slug,
+        "slug": page.slug,
         "form": form,
         "type": "update",
         "author": author,
@@ -232,9 +326,12 @@ def delete(request, id):
   Args:
     id: Page ID
   """
-  page = get_object_or_404(PageTable, pk=id)
-  if request.user == page.user or page.edit_permission:
-    page.delete()
+  # Authorization is part of the WHERE clause, so this is a single DELETE
+  deleted, _ = PageTable.objects.filter(pk=id).filter(
+    Q(user=request.user) | Q(edit_permission=True)
+  ).delete()
+  if deleted == 0:
+    return not_found(request)
   return redirect("wiki:index")
 
 
@@ -245,10 +342,23 @@ def page_settings(request):
   Allows users to update multiple pages at once
   """
   if request.method == "POST":
-    pages = PageTable.objects.filter(user=request.user)
+    pages = PageTable.objects.filter(user=request.user).defer("text")
     formset = PageSettingsFormSet(request.POST, queryset=pages)
     if formset.is_valid():
-      formset.save()
+      # Write all changed rows in one UPDATE instead of one per form
+      changed_pages = []
+      changed_fields = set()
+      for form in formset.initial_forms:
+        if form.has_changed():
+          changed_pages.append(form.instance)
+          changed_fields.update(form.changed_data)
+      if changed_pages:
+        # bulk_update() bypasses save(), so bump auto_now field explicitly
+        now = timezone.now()
+        for page in changed_pages:
+          page.last_updated = now
+        changed_fields.add('last_updated')
+        PageTable.objects.bulk_update(changed_pages, fields=sorted(changed_fields))
 
       # Redirect based on action button pressed
       if request.POST['action'] == 'continue':
@@ -258,12 +368,10 @@ def page_settings(request):
       else:
         raise Exception("Invalid action")
     else:
-      print("---- Error ----")
-      print("formset.errors:")
-      print(formset.errors)
-      print("formset.management_form.errors:")
-      print(formset.management_form.errors)
-      print("---------------")
+      logger.error(
+        "Page settings formset validation failed: errors=%s management_form.errors=%s",
+        formset.errors, formset.management_form.errors
+      )
       raise Exception("Form validation failed")
   else:
     # Get pages ordered by tree hierarchy